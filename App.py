@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
-from scipy.stats import poisson
+import numpy as np
 import datetime
+import math
 import os
 
 # Page configuration
@@ -99,21 +100,89 @@ with l_col2:
 
 # --- Top 3 Picks Dashboard Logic ---
 
+PICK_CARD_TEMPLATE = """
+<div class="pick-card">
+    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
+        <span style="color: #8b949e; font-size: 0.9em;">{league}</span>
+        <span style="background-color: rgba(0, 255, 65, 0.1); color: #00ff41; padding: 2px 8px; border-radius: 12px; font-size: 0.8em; border: 1px solid #00ff41;">
+            {conf}% Conf.
+        </span>
+    </div>
+    <h3 style="margin: 0; font-size: 1.2em; color: white !important;">{home}</h3>
+    <div style="text-align: center; color: #8b949e; margin: 5px 0;">vs</div>
+    <h3 style="margin: 0; font-size: 1.2em; color: white !important;">{away}</h3>
+    <div style="margin-top: 15px; display: flex; justify-content: space-between; align-items: flex-end;">
+        <div style="display: flex; flex-direction: column;">
+            <span style="color: #00ff41; font-weight: bold;">Over 1.5 Goals</span>
+            <span style="color: #8b949e; font-size: 0.8em;">📅 {date}</span>
+        </div>
+        <span style="color: #8b949e;">🕒 {time}</span>
+    </div>
+</div>
+"""
+
+RESULT_CARD_TEMPLATE = """
+<div style="background-color: #161b22; padding: 10px; border-radius: 8px; margin-bottom: 8px; border-left: 5px solid {border_color};">
+    <div style="display: flex; justify-content: space-between; align-items: center;">
+        <span style="color: #8b949e; font-size: 0.9em;">{league}</span>
+        <span style="font-weight: bold; color: {status_color};">{status} Over 1.5</span>
+    </div>
+    <div style="display: flex; justify-content: space-between; align-items: center; margin-top: 5px;">
+        <span style="font-size: 1.1em; flex: 1; text-align: right; padding-right: 15px;">{home}</span>
+        <span style="background-color: #0e1117; padding: 2px 10px; border-radius: 4px; font-weight: bold; font-family: monospace; font-size: 1.2em;">{home_score} - {away_score}</span>
+        <span style="font-size: 1.1em; flex: 1; text-align: left; padding-left: 15px;">{away}</span>
+    </div>
+</div>
+"""
+RESULT_BORDER_COLORS = {"✅": "#00ff41", "❌": "#ff4d4d", "⏳": "#8b949e"}
+RESULT_STATUS_COLORS = {"✅": "#00ff41", "❌": "#ff4d4d", "⏳": "white"}
+
+# Integer nanosecond mtime keeps cache keys exact; 0 when the file is missing
+def file_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+# Prefer the Parquet copy written by the scraper, unless the CSV is newer
+# (e.g. the Parquet write failed, or the CSV was edited by hand)
+def predictions_path():
+    parquet_mtime = file_mtime('predictions.parquet')
+    if parquet_mtime and parquet_mtime >= file_mtime('predictions.csv'):
+        return 'predictions.parquet'
+    return 'predictions.csv'
+
+def read_predictions(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    # No dtype= here: combined with the pyarrow engine it fails on the empty score cells
+    df = pd.read_csv(path, engine='pyarrow', parse_dates=['Date'])
+    # pyarrow may infer Time as a time type; keep it as "HH:MM" text
+    df['Time'] = df['Time'].astype(str).str[:5]
+    return df
+
 @st.cache_data(ttl=300)
-def load_predictions(mtime):
+def load_predictions(path, mtime):
     try:
-        df = pd.read_csv('predictions.csv')
-        # Ensure correct types
-        df['Date'] = pd.to_datetime(df['Date'])
+        df = read_predictions(path)
         # Ensure Score columns are numeric or handle them as objects
-        df['HomeScore'] = pd.to_numeric(df['HomeScore'], errors='coerce')
-        df['AwayScore'] = pd.to_numeric(df['AwayScore'], errors='coerce')
-        return df
+        df['HomeScore'] = pd.to_numeric(df['HomeScore'], errors='coerce').astype('float32')
+        df['AwayScore'] = pd.to_numeric(df['AwayScore'], errors='coerce').astype('float32')
+        # Compact dtypes: repeated names as categories, probabilities as float32
+        for col in ('League', 'HomeTeam', 'AwayTeam'):
+            df[col] = df[col].astype('category')
+        for col in ('Over15_Rate_Home', 'Over15_Rate_Away', 'Model_Prob'):
+            df[col] = df[col].astype('float32')
+        # Sorted date index lets date lookups use binary search instead of full-column masks
+        return df.sort_values('Date', kind='stable').set_index('Date')
     except FileNotFoundError:
-        return pd.DataFrame()
+        return empty_predictions()
     except Exception as e:
         st.error(f"Error loading predictions: {e}")
-        return pd.DataFrame()
+        return empty_predictions()
+
+def empty_predictions():
+    return pd.DataFrame(index=pd.DatetimeIndex([], name='Date'))
 
 def get_top_picks(df):
     if df.empty:
@@ -121,110 +190,112 @@ def get_top_picks(df):
     
     # Sort by confidence descending and take top 3
     # We no longer apply a strict 70% filter here to ensure we always have 3 games if data exists
-    top_picks = df.sort_values(by=['Date', 'Model_Prob'], ascending=[True, False]).head(3)
+    top_picks = df.reset_index().sort_values(by=['Date', 'Model_Prob'], ascending=[True, False]).head(3)
     return top_picks
 
 # Display Dashboard
 st.header("🔥 Daily Top 3 Picks")
 
 # Get file modification time to force cache refresh when file changes
-try:
-    predictions_mtime = os.path.getmtime('predictions.csv')
-except:
-    predictions_mtime = 0
+predictions_file = predictions_path()
+predictions_mtime = file_mtime(predictions_file)
 
-picks_df = load_predictions(predictions_mtime)
+picks_df = load_predictions(predictions_file, predictions_mtime)
 
 # Get Today's Date
 today = pd.Timestamp.now().normalize()
 
 # Filter for today and future games to ensure we can always pick 3
-future_games = picks_df[picks_df['Date'] >= today]
+future_games = picks_df.loc[today:]
 top_picks = get_top_picks(future_games)
 
 if top_picks.empty:
     st.info(f"No high-confidence picks available for today ({today.strftime('%d %b %Y')}). Check back later!")
 else:
     cols = st.columns(3)
-    for index, (col, row) in enumerate(zip(cols, top_picks.iterrows())):
-        row_data = row[1]
+    for col, pick in zip(cols, top_picks.itertuples(index=False)):
         with col:
-            # Format date: "Mon 20 May 2024"
-            match_date = row_data['Date'].strftime('%a %d %b %Y')
-            
-            st.markdown(f"""
-            <div class="pick-card">
-                <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
-                    <span style="color: #8b949e; font-size: 0.9em;">{row_data['League']}</span>
-                    <span style="background-color: rgba(0, 255, 65, 0.1); color: #00ff41; padding: 2px 8px; border-radius: 12px; font-size: 0.8em; border: 1px solid #00ff41;">
-                        {int(row_data['Model_Prob']*100)}% Conf.
-                    </span>
-                </div>
-                <h3 style="margin: 0; font-size: 1.2em; color: white !important;">{row_data['HomeTeam']}</h3>
-                <div style="text-align: center; color: #8b949e; margin: 5px 0;">vs</div>
-                <h3 style="margin: 0; font-size: 1.2em; color: white !important;">{row_data['AwayTeam']}</h3>
-                <div style="margin-top: 15px; display: flex; justify-content: space-between; align-items: flex-end;">
-                    <div style="display: flex; flex-direction: column;">
-                        <span style="color: #00ff41; font-weight: bold;">Over 1.5 Goals</span>
-                        <span style="color: #8b949e; font-size: 0.8em;">📅 {match_date}</span>
-                    </div>
-                    <span style="color: #8b949e;">🕒 {row_data['Time']}</span>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(PICK_CARD_TEMPLATE.format(
+                league=pick.League,
+                # round() rather than int() so float32 probabilities like 0.7 don't show as 69%
+                conf=round(pick.Model_Prob * 100),
+                home=pick.HomeTeam,
+                away=pick.AwayTeam,
+                # Format date: "Mon 20 May 2024"
+                date=pick.Date.strftime('%a %d %b %Y'),
+                time=pick.Time
+            ), unsafe_allow_html=True)
 
 
 st.markdown("---")
 # --- Previous Day's Results ---
 st.header("📉 Yesterday's Results")
 yesterday = today - pd.Timedelta(days=1)
-yesterdays_games = picks_df[picks_df['Date'] == yesterday]
+yesterdays_games = picks_df.loc[yesterday:yesterday]
 
 if yesterdays_games.empty:
     st.info(f"No results found for yesterday ({yesterday.strftime('%d %b %Y')}).")
 else:
     # We display these in a smaller format or a simple table
-    for _, result in yesterdays_games.iterrows():
-        # Check if score exists in CSV
-        h_score = result.get('HomeScore')
-        a_score = result.get('AwayScore')
-        
-        has_score = not pd.isna(h_score) and not pd.isna(a_score)
-        
-        h_score_disp = int(h_score) if has_score else "-"
-        a_score_disp = int(a_score) if has_score else "-"
-        
-        status = "✅" if (has_score and (h_score + a_score) >= 2) else "❌" if has_score else "⏳"
-        
-        st.markdown(f"""
-        <div style="background-color: #161b22; padding: 10px; border-radius: 8px; margin-bottom: 8px; border-left: 5px solid {'#00ff41' if status == '✅' else '#ff4d4d' if status == '❌' else '#8b949e'};">
-            <div style="display: flex; justify-content: space-between; align-items: center;">
-                <span style="color: #8b949e; font-size: 0.9em;">{result['League']}</span>
-                <span style="font-weight: bold; color: {'#00ff41' if status == '✅' else '#ff4d4d' if status == '❌' else 'white'};">{status} Over 1.5</span>
-            </div>
-            <div style="display: flex; justify-content: space-between; align-items: center; margin-top: 5px;">
-                <span style="font-size: 1.1em; flex: 1; text-align: right; padding-right: 15px;">{result['HomeTeam']}</span>
-                <span style="background-color: #0e1117; padding: 2px 10px; border-radius: 4px; font-weight: bold; font-family: monospace; font-size: 1.2em;">{h_score_disp} - {a_score_disp}</span>
-                <span style="font-size: 1.1em; flex: 1; text-align: left; padding-left: 15px;">{result['AwayTeam']}</span>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+    total_goals = yesterdays_games['HomeScore'] + yesterdays_games['AwayScore']
+    statuses = np.where(total_goals.isna(), "⏳", np.where(total_goals >= 2, "✅", "❌"))
+
+    result_cards = []
+    for result, status in zip(yesterdays_games.itertuples(index=False), statuses):
+        has_score = status != "⏳"
+        result_cards.append(RESULT_CARD_TEMPLATE.format(
+            border_color=RESULT_BORDER_COLORS[status],
+            status_color=RESULT_STATUS_COLORS[status],
+            status=status,
+            league=result.League,
+            home=result.HomeTeam,
+            away=result.AwayTeam,
+            home_score=int(result.HomeScore) if has_score else "-",
+            away_score=int(result.AwayScore) if has_score else "-",
+        ))
+
+    # One markdown call for all cards instead of one per row
+    st.markdown("".join(result_cards), unsafe_allow_html=True)
 
 st.markdown("---")
 st.header("🧮 Match Calculator")
 
 # --- Existing Calculator Logic ---
 
-@st.cache_data
-def load_data():
+# Scoreline grid for the Poisson model (0-9 goals each side)
+MAX_GOALS = 10
+
+def poisson_outcomes(home_exp, away_exp):
+    home_win_prob, draw_prob, away_win_prob = 0.0, 0.0, 0.0
+    # Poisson pmf via the recurrence p(k+1) = p(k) * lambda / (k+1)
+    p_home = math.exp(-home_exp)
+    for i in range(MAX_GOALS):
+        p_away = math.exp(-away_exp)
+        for j in range(MAX_GOALS):
+            prob = p_home * p_away
+            if i > j: home_win_prob += prob
+            elif i == j: draw_prob += prob
+            else: away_win_prob += prob
+            p_away *= away_exp / (j + 1)
+        p_home *= home_exp / (i + 1)
+    return home_win_prob, draw_prob, away_win_prob
+
+# Disk-persisted caches survive app restarts, so cold starts skip re-parsing E0.csv.
+# load_data is keyed on the file's mtime so an updated dataset isn't served stale.
+@st.cache_data(persist='disk')
+def load_data(mtime):
     try:
         # Load the dataset
-        df = pd.read_csv('E0.csv')
+        df = pd.read_csv('E0.csv', engine='pyarrow')
         # Ensure we have the necessary columns
         required_columns = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG']
         if not all(col in df.columns for col in required_columns):
             st.error(f"Error: Missing required columns. Expected: {required_columns}")
             return pd.DataFrame()
+        # Compact dtypes: both team columns share one category set, goals fit in Int8
+        team_dtype = pd.CategoricalDtype(sorted(set(df['HomeTeam']) | set(df['AwayTeam'])))
+        df[['HomeTeam', 'AwayTeam']] = df[['HomeTeam', 'AwayTeam']].astype(team_dtype)
+        df[['FTHG', 'FTAG']] = df[['FTHG', 'FTAG']].astype('Int8')
         return df
     except FileNotFoundError:
         st.error("Error: 'E0.csv' data file not found. Please ensure the file exists in the directory.")
@@ -233,7 +304,28 @@ def load_data():
         st.error(f"An unexpected error occurred loading data: {e}")
         return pd.DataFrame()
 
-df = load_data()
+@st.cache_data(max_entries=512)
+def compute_outcome_probs(home_exp, away_exp):
+    return poisson_outcomes(home_exp, away_exp)
+
+@st.cache_data(persist='disk')
+def compute_team_means(df):
+    home_means = df.groupby('HomeTeam', observed=True)['FTHG'].mean().to_dict()
+    away_means = df.groupby('AwayTeam', observed=True)['FTAG'].mean().to_dict()
+    return home_means, away_means
+
+RECENT_COLUMNS = ['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG']
+
+@st.cache_data(persist='disk')
+def build_recent(df, n=5):
+    # Each match appears once per team; sort_index restores file (chronological) order
+    long = pd.concat([
+        df[RECENT_COLUMNS].assign(team=df['HomeTeam']),
+        df[RECENT_COLUMNS].assign(team=df['AwayTeam'])
+    ]).sort_index(kind='stable')
+    return {team: games.tail(n)[RECENT_COLUMNS] for team, games in long.groupby('team', observed=True, sort=False)}
+
+df = load_data(file_mtime('E0.csv'))
 
 if not df.empty:
     # sort teams for better UX
@@ -250,6 +342,9 @@ if not df.empty:
     with c2:
         away_team = st.selectbox("Select Away Team", away_teams_options, index=0)
 
+    home_means, away_means = compute_team_means(df)
+    team_recent = build_recent(df)
+
     # Initialize session state for storing predictions
     if 'prediction_made' not in st.session_state:
         st.session_state.prediction_made = False
@@ -261,20 +356,16 @@ if not df.empty:
 
     if st.button("Calculate Prediction", type="primary"):
         # Calculate goal expectancy
-        home_exp = df[df['HomeTeam'] == home_team]['FTHG'].mean()
-        away_exp = df[df['AwayTeam'] == away_team]['FTAG'].mean()
+        home_exp = home_means.get(home_team, np.nan)
+        away_exp = away_means.get(away_team, np.nan)
         
         if pd.isna(home_exp) or pd.isna(away_exp):
             st.error("Insufficient data to calculate predictions for one or both teams.")
         else:
-            # Poisson
-            home_win_prob, draw_prob, away_win_prob = 0, 0, 0
-            for i in range(10): 
-                for j in range(10):
-                    prob = poisson.pmf(i, home_exp) * poisson.pmf(j, away_exp)
-                    if i > j: home_win_prob += prob
-                    elif i == j: draw_prob += prob
-                    else: away_win_prob += prob
+            # Poisson (rounded so repeat selections hit the cache)
+            home_win_prob, draw_prob, away_win_prob = compute_outcome_probs(
+                round(float(home_exp), 4), round(float(away_exp), 4)
+            )
             
             st.session_state.home_win_prob = home_win_prob
             st.session_state.draw_prob = draw_prob
@@ -304,15 +395,15 @@ if not df.empty:
         tab1, tab2 = st.tabs([f"{home_team} Recent", f"{away_team} Recent"])
 
         with tab1:
-            home_recent = df[(df['HomeTeam'] == home_team) | (df['AwayTeam'] == home_team)].tail(5)
-            if not home_recent.empty:
-                st.dataframe(home_recent[['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG']], use_container_width=True, hide_index=True)
+            home_recent = team_recent.get(home_team)
+            if home_recent is not None and not home_recent.empty:
+                st.dataframe(home_recent, use_container_width=True, hide_index=True)
             else:
                 st.info("No recent games found.")
 
         with tab2:
-            away_recent = df[(df['HomeTeam'] == away_team) | (df['AwayTeam'] == away_team)].tail(5)
-            if not away_recent.empty:
-                st.dataframe(away_recent[['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG']], use_container_width=True, hide_index=True)
+            away_recent = team_recent.get(away_team)
+            if away_recent is not None and not away_recent.empty:
+                st.dataframe(away_recent, use_container_width=True, hide_index=True)
             else:
                 st.info("No recent games found.")
\ No newline at end of file
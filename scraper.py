@@ -1,7 +1,12 @@
 import os
 import requests
 import pandas as pd
+import threading
 import time
+from collections import deque
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 # API Configuration
@@ -13,19 +18,62 @@ except:
 
 BASE_URL = "https://api.football-data.org/v4/"
 HEADERS = {'X-Auth-Token': API_TOKEN}
+REQUEST_TIMEOUT = 10
+
+RATE_LIMIT_WAIT = 60  # seconds to wait on a 429 without a Retry-After header
+
+# Shared session so connections are kept alive and reused across requests.
+# urllib3 retries server errors; 429s are handled in make_request, since the
+# API's per-minute quota needs a minute-scale wait rather than a short backoff.
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
+))
 
 # Competition IDs
 COMPETITIONS = ['PL', 'BL1', 'PD', 'SA', 'FL1', 'CL']
 
+# Bounds how many requests are in flight at once; the per-minute quota is
+# enforced separately by wait_for_rate_limit
+MAX_WORKERS = 4
+
+# football-data.org free tier quota, shared by all worker threads
+REQUESTS_PER_MINUTE = 10
+_request_times = deque()
+_rate_lock = threading.Lock()
+
+def wait_for_rate_limit():
+    """Blocks until another request fits in the sliding one-minute window."""
+    while True:
+        with _rate_lock:
+            now = time.monotonic()
+            while _request_times and now - _request_times[0] >= 60:
+                _request_times.popleft()
+            if len(_request_times) < REQUESTS_PER_MINUTE:
+                _request_times.append(now)
+                return
+            wait = 60 - (now - _request_times[0])
+        time.sleep(wait)
+
 def make_request(url):
     """Makes an API request with basic error handling and rate limiting check."""
-    for _ in range(3):  # Simple retry logic
-        response = requests.get(url, headers=HEADERS)
+    for _ in range(3):  # Retry on rate limiting; server errors are retried by SESSION
+        wait_for_rate_limit()
+        try:
+            response = SESSION.get(url, timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            print(f"Request failed: {e}")
+            return None
         if response.status_code == 200:
             return response.json()
         elif response.status_code == 429:
-            print("Rate limit reached. Waiting 60 seconds...")
-            time.sleep(60)
+            retry_after = response.headers.get('Retry-After', '')
+            wait = int(retry_after) if retry_after.isdigit() else RATE_LIMIT_WAIT
+            print(f"Rate limit reached. Waiting {wait} seconds...")
+            time.sleep(wait)
         else:
             print(f"Error {response.status_code}: {response.text}")
             return None
@@ -47,23 +95,36 @@ def get_fixtures(competition):
         return []
     return data.get('matches', [])
 
-def calculate_over15_rate(matches, team_name):
-    """Calculates the percentage of matches involving a team that had over 1.5 goals."""
-    relevant_matches = [
-        m for m in matches 
-        if m['homeTeam']['name'] == team_name or m['awayTeam']['name'] == team_name
-    ]
-    if not relevant_matches:
-        return 0.5  # Default to 50% if no data
-    
-    over15_count = 0
-    for m in relevant_matches:
-        score = m['score']['fullTime']
-        if score['home'] is not None and score['away'] is not None:
-            if (score['home'] + score['away']) >= 2:
-                over15_count += 1
-    
-    return over15_count / len(relevant_matches)
+def calculate_over15_rates(matches):
+    """Calculates, for every team, the percentage of its matches that had over 1.5 goals."""
+    if not matches:
+        return {}
+
+    hdf = pd.DataFrame([{
+        'home': m['homeTeam']['name'],
+        'away': m['awayTeam']['name'],
+        'home_score': m['score']['fullTime']['home'],
+        'away_score': m['score']['fullTime']['away']
+    } for m in matches])
+    # Matches without a recorded score still count towards the total, as a miss
+    total_goals = hdf['home_score'].astype(float) + hdf['away_score'].astype(float)
+    hdf['over15'] = total_goals.fillna(0) >= 2
+
+    long = pd.concat([
+        hdf[['home', 'over15']].rename(columns={'home': 'team'}),
+        hdf[['away', 'over15']].rename(columns={'away': 'team'})
+    ])
+    return long.groupby('team')['over15'].mean().to_dict()
+
+def fetch_competition(comp, date_from, date_to):
+    """Fetches historical matches, upcoming fixtures and recent results for a competition."""
+    print(f"Fetching {comp}...")
+    historical = get_historical_data(comp)
+    fixtures = get_fixtures(comp)
+    # Recently finished matches (past 2 days) to show results
+    url_results = f"{BASE_URL}competitions/{comp}/matches?status=FINISHED&dateFrom={date_from}&dateTo={date_to}"
+    recent_results = make_request(url_results)
+    return comp, historical, fixtures, recent_results
 
 def run_scraper():
     if not API_TOKEN:
@@ -76,14 +137,21 @@ def run_scraper():
     today_dt = datetime.now()
     yesterday_str = (today_dt - timedelta(days=1)).strftime('%Y-%m-%d')
     tomorrow_plus_2 = (today_dt + timedelta(days=2)).strftime('%Y-%m-%d')
+    # Only predict for the next 3 days; ISO dates compare correctly as strings
+    cutoff_str = (today_dt + timedelta(days=3)).strftime('%Y-%m-%d')
     
-    for comp in COMPETITIONS:
+    # Competitions are independent, so fetch them concurrently
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = list(executor.map(
+            lambda comp: fetch_competition(comp, yesterday_str, today_dt.strftime('%Y-%m-%d')),
+            COMPETITIONS
+        ))
+
+    for comp, historical, fixtures, recent_results in results:
         print(f"Processing {comp}...")
-        historical = get_historical_data(comp)
+        rates = calculate_over15_rates(historical)
         
-        # 1. Fetch recently finished matches (past 2 days) to show results
-        url_results = f"{BASE_URL}competitions/{comp}/matches?status=FINISHED&dateFrom={yesterday_str}&dateTo={today_dt.strftime('%Y-%m-%d')}"
-        recent_results = make_request(url_results)
+        # 1. Recently finished matches
         if recent_results:
             for match in recent_results.get('matches', []):
                 all_data.append({
@@ -92,28 +160,26 @@ def run_scraper():
                     'HomeTeam': match['homeTeam']['name'],
                     'AwayTeam': match['awayTeam']['name'],
                     'Time': match['utcDate'].split('T')[1][:5],
-                    'Over15_Rate_Home': round(calculate_over15_rate(historical, match['homeTeam']['name']), 2),
-                    'Over15_Rate_Away': round(calculate_over15_rate(historical, match['awayTeam']['name']), 2),
+                    'Over15_Rate_Home': round(rates.get(match['homeTeam']['name'], 0.5), 2),
+                    'Over15_Rate_Away': round(rates.get(match['awayTeam']['name'], 0.5), 2),
                     'Model_Prob': 0, # Prob 0 for finished matches
                     'HomeScore': match['score']['fullTime']['home'],
                     'AwayScore': match['score']['fullTime']['away']
                 })
 
-        # 2. Fetch scheduled matches
-        fixtures = get_fixtures(comp)
+        # 2. Scheduled matches
         for fixture in fixtures:
             home_team = fixture['homeTeam']['name']
             away_team = fixture['awayTeam']['name']
             match_date = fixture['utcDate'].split('T')[0]
             match_time = fixture['utcDate'].split('T')[1][:5]
             
-            # Simple check to only predict for next 3 days
-            date_obj = datetime.strptime(match_date, '%Y-%m-%d')
-            if date_obj > today_dt + timedelta(days=3):
+            if match_date > cutoff_str:
                 continue
                 
-            rate_home = calculate_over15_rate(historical, home_team)
-            rate_away = calculate_over15_rate(historical, away_team)
+            # Default to 50% if no data
+            rate_home = rates.get(home_team, 0.5)
+            rate_away = rates.get(away_team, 0.5)
             
             # Combined internal probability
             model_prob = (rate_home + rate_away) / 2
@@ -131,12 +197,22 @@ def run_scraper():
                 'AwayScore': ''
             })
             
-    # Save to CSV
+    # Save to CSV and Parquet
     if all_data:
         df = pd.DataFrame(all_data)
         # Drop duplicates if any (e.g., if a match transitioned status during run)
         df = df.drop_duplicates(subset=['Date', 'HomeTeam', 'AwayTeam'])
-        df.to_csv('predictions.csv', index=False)
+        # Write to a temp file then swap it in, so the app never reads a partial file
+        df.to_csv('predictions.csv.tmp', index=False)
+        os.replace('predictions.csv.tmp', 'predictions.csv')
+        # Typed columnar copy for faster loading in the app
+        parquet_df = df.assign(
+            Date=pd.to_datetime(df['Date']),
+            HomeScore=pd.to_numeric(df['HomeScore'], errors='coerce'),
+            AwayScore=pd.to_numeric(df['AwayScore'], errors='coerce')
+        )
+        parquet_df.to_parquet('predictions.parquet.tmp', compression='zstd', index=False)
+        os.replace('predictions.parquet.tmp', 'predictions.parquet')
         print(f"Scraper finished. Saved {len(all_data)} entries.")
     else:
         print("No data fetched.")